@@ -6,11 +6,13 @@ delete, modify, search, play songs and create save lists based on criteria.
 
 Features:
 - Add songs to the storage and metadata to the database by path.
+- Add all the songs of a directory at once.
 - Delete songs and their metadata by their ID.
 - Modify metadata for existing songs.
 - Search for songs based on criteria.
 - Create a save list archive of songs based on criteria.
 - Play songs using pygame library.
+- Run scripts of commands.
 
 Usage:
 1. Run the script.
@@ -19,20 +21,34 @@ Usage:
 
 Dependencies:
 - PostgreSQL for the database(psql).
-- Python modules: pg8000, os, shutil, datetime, zipfile, pygame, time
-(use: 'pip install pg8000' and 'pip install pygame' if needed).
+- Python modules: psycopg, atexit, functools, itertools, os, errno, shutil, stat, re, datetime,
+zipfile, concurrent.futures, collections, pygame, mutagen, time, sys, cmd, shlex
+(use: 'pip install "psycopg[binary]"', 'pip install pygame' and 'pip install mutagen'
+if needed).
 
 Author: Lavric Adrian-Gabriel 3A3, Facultatea de Informatica Iasi, UAIC
 Date: 7.01.2025
 """
 
-import pg8000 # For connecting to the PostgreSQL database
+import psycopg # For connecting to the PostgreSQL database
+import atexit # For closing the database connection on exit
+import functools # For wrapping the database commands
+from itertools import chain, islice # For streaming the rows of the searches
 import os # For working with files
-import shutil # For copying files
-from datetime import datetime # For handling date formatting
+import errno # For telling which errors of the hard links allow copying the song instead
+import shutil # For streaming big songs to the archive
+import stat # For checking the songs are regular files
+import re # For parsing the search criteria and validating dates
+from datetime import date # For validating the release dates
 import zipfile # For creating the archive
+from concurrent.futures import ThreadPoolExecutor # For copying and reading songs in parallel
+from collections import deque, namedtuple # For reading songs ahead and for the rows of songs
 import pygame # For playing songs
+import mutagen # For reading the length of songs
 import time # For handling rewinding/forwarding songs
+import sys # For writing the search results
+import cmd # For the interactive loop
+import shlex # For splitting the args of the commands
 
 #Database setup
 USER = "postgres" #: Database user name
@@ -40,10 +56,71 @@ PASSWORD = "postgres" #: Database user password
 HOST = "localhost" #: Database host name
 DB = "songstorage" #: Database name
 
+#File written once the database and the 'Storage' folder are set up, holding the version
+#of 'table_setup_query' (to be increased when the query changes, so the setup runs again)
+SETUP_SENTINEL = ".storage_initialized"
+SETUP_VERSION = "1"
+
+#Persistent connection to the 'songstorage' database, shared by all commands
+_CONN = None
+
+#Index of the songs of the 'Storage' folder (file name -> path), built on first use
+_STORAGE_INDEX = None
+
+#Cached results of the searches holding a single page (criteria -> (period, rows)), and
+#the maximum number of them kept, so at most 'SEARCH_CACHE_SIZE * FETCH_SIZE' rows are cached
+_SEARCH_CACHE = {}
+SEARCH_CACHE_SIZE = 64
+
+#Lines queued by the 'run_script' command, read before the console
+_PENDING_INPUT = deque()
+
 #Valid song extensions
 SONG_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".aiff", ".mp4"}
+_SONG_EXT_TUPLE = tuple(SONG_EXTENSIONS) # For checking the extension with 'str.endswith'
+
+#Format of the release dates
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+#Rows of the 'songs' table, and the metadata that can be modified
+Song = namedtuple("Song", ["id", "file_name", "artist", "song_name", "release_date", "tags"])
+SongMetadata = namedtuple("SongMetadata", ["artist", "song_name", "release_date", "tags"])
+
+#Format of the songs listed by 'search', filled with the fields of a 'Song'
+_ROW_FMT = "ID: {}, File_name: {}, Artist: {}, Song_name: {}, Release_date: {}, Tags: {}\n".format
 
-#SQL query for table set up
+#Search criteria: key -> (SQL condition, formatter of the value), '{}' being the param
+_CRITERIA = {
+    "artist": ("artist ILIKE {}", lambda value: f"%{value}%"),
+    "song_name": ("song_name ILIKE {}", lambda value: f"%{value}%"),
+    "release_date": ("release_date = {}", lambda value: value),
+    "tags": ("tags && CAST({} AS text[])", lambda value: _array_literal(_TAG_SEPARATOR.split(value))),
+    "file_name": ("file_name ILIKE {}", lambda value: f"%{value}%"),
+}
+_CRITERIA_SEPARATOR = re.compile(r"\s*,\s*")
+_VALUE_SEPARATOR = re.compile(r"\s*=\s*")
+_TAG_SEPARATOR = re.compile(r"\s*\|\s*") # For searching any of many tags, e.g. "tags=rap|pop"
+
+#Number of songs sent in each statement of the bulk operations
+BULK_PAGE_SIZE = 1000
+
+#Number of rows fetched at once by the searches
+FETCH_SIZE = 1000
+
+#Number of seconds the results of the searches are cached for
+SEARCH_CACHE_TTL = 60
+
+#Errors of 'os.link' for which the song is copied instead (other filesystem, no hard links)
+_COPY_INSTEAD_OF_LINK = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK}
+
+#Buffer size used when copying songs to the storage or to an archive (1 MiB)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+#Songs bigger than this (4 MiB) are streamed to the archives instead of being read ahead,
+#so the songs read ahead by the 8 threads of '_prefetch' hold at most 36 MiB
+ARCHIVE_READ_LIMIT = 4 * 1024 * 1024
+
+#SQL query for table and indexes set up
 table_setup_query = """
 CREATE TABLE IF NOT EXISTS songs (
     id SERIAL PRIMARY KEY,           -- id of each song
@@ -51,46 +128,204 @@ CREATE TABLE IF NOT EXISTS songs (
     artist VARCHAR(255) NOT NULL,    -- name of the artist
     song_name VARCHAR(255) NOT NULL, -- name of the song
     release_date DATE,               -- release date of the song
-    tags TEXT[]                      -- list of tags of the song
+    tags TEXT[],                     -- list of tags of the song
+    duration_seconds REAL            -- length of the song
 );
+ALTER TABLE songs ADD COLUMN IF NOT EXISTS duration_seconds REAL;
+CREATE INDEX IF NOT EXISTS idx_songs_tags ON songs USING gin (tags);
+CREATE INDEX IF NOT EXISTS idx_songs_release_date ON songs (release_date);
+"""
+
+#SQL query for the trigram indexes of the 'ILIKE' searches, optional since the 'pg_trgm'
+#extension is not available on every server (without it the searches scan the table)
+trigram_setup_query = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_songs_artist_trgm ON songs USING gin (artist gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_songs_song_name_trgm ON songs USING gin (song_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_songs_file_name_trgm ON songs USING gin (file_name gin_trgm_ops);
 """
 
 
 def database_setup():
     """
     This method sets up the 'songstorage' PostgreSQL database. It connects to the
-    'postgres' database and checks if 'songstorage' exists and connects to it, if
-    it does not, it creates it, and creates the 'songs' table.
+    'postgres' database and creates 'songstorage' if it does not exist (detected by
+    the error of 'CREATE DATABASE', without a separate check), then it opens the
+    persistent connection to 'songstorage' and creates the 'songs' table and its
+    indexes with a single round trip. The trigram indexes are created in a separate
+    step, whose failure (e.g. 'pg_trgm' is not installed) is only logged, since the
+    searches work without them.
 
     Handles any errors that may occur during interacting with the database.
 
     Returns:
-        None
+        bool: True if the database is set up, False otherwise.
     """
 
     try:
-        conn = pg8000.connect(user=USER, password=PASSWORD, host=HOST, database="postgres")
-        conn.autocommit = True
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM pg_database WHERE datname = 'songstorage'")
-        if cursor.fetchone() is None:
-            cursor.execute("CREATE DATABASE songstorage")
-            print("Database 'songstorage' was created.")
-        else:
-            print("Database 'songstorage' exists.")
-        cursor.close()
-        conn.close()
-
-        conn = pg8000.connect(user=USER, password=PASSWORD, host=HOST, database=DB)
-        cursor = conn.cursor()
-        cursor.execute(table_setup_query)
+        with psycopg.connect(user=USER, password=PASSWORD, host=HOST, dbname="postgres",
+                             autocommit=True) as conn:
+            try:
+                conn.execute("CREATE DATABASE songstorage")
+                print("Database 'songstorage' was created.")
+            except psycopg.errors.DuplicateDatabase:
+                print("Database 'songstorage' exists.")
+
+        get_conn().execute(table_setup_query)
         print("Table 'songs' was created.")
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-    except pg8000.dbapi.DatabaseError as e:
+        try:
+            get_conn().execute(trigram_setup_query)
+        except psycopg.DatabaseError as e:
+            if isinstance(e, psycopg.OperationalError) and _connection_lost(e):
+                raise
+            print(f"Trigram indexes were not created, the searches will be slower: {e}")
+        return True
+
+    except psycopg.DatabaseError as e:
         print(f"Database 'song_storage' error: {e}")
+        return False
+
+
+def get_conn():
+    """
+    This method returns the persistent connection to the 'songstorage' database.
+    The connection is opened on first use and then reused by every command, so only
+    the first command pays for the TCP handshake and the authentication.
+    The connection runs in autocommit mode, so each statement is committed on its own.
+    With 'psycopg[binary]' installed, the rows are decoded by the C extension of psycopg.
+
+    Returns:
+        psycopg.Connection: The connection to the 'songstorage' database.
+    """
+
+    global _CONN
+    if _CONN is None:
+        try:
+            _CONN = psycopg.connect(user=USER, password=PASSWORD, host=HOST, dbname=DB, autocommit=True)
+        except psycopg.OperationalError:
+            _forget_setup()
+            raise
+    return _CONN
+
+
+def _execute(sql, **params):
+    """
+    This method runs a statement on the persistent connection and returns its rows.
+    The statement is prepared on first use (psycopg keeps the prepared statements of
+    the connection by their SQL), so PostgreSQL parses and plans each statement only
+    once per connection, and later calls only bind and execute it.
+
+    Args:
+        sql (str): The SQL statement, with named parameters (e.g. "WHERE id = %(id)s").
+        **params: The values of the parameters.
+
+    Returns:
+        list: The rows returned by the statement.
+    """
+
+    return get_conn().execute(sql, params, prepare=True).fetchall()
+
+
+def close_conn():
+    """
+    This method closes the persistent connection to the 'songstorage' database, if
+    it is open, so the next call of 'get_conn' opens a new one (the statements prepared
+    on it are closed with it). Errors raised while closing an already broken
+    connection are ignored.
+
+    Returns:
+        None
+    """
+
+    global _CONN
+    if _CONN is not None:
+        try:
+            _CONN.close()
+        except (psycopg.Error, OSError):
+            pass
+        _CONN = None
+
+
+#The persistent connection is closed however the application exits (e.g. Ctrl+C)
+atexit.register(close_conn)
+
+
+def _connection_lost(error):
+    """
+    This method checks if a database error was caused by the loss of the persistent
+    connection (e.g. the server was restarted or closed the idle connection), and not by
+    the statement itself (e.g. it was canceled or could not get a lock).
+
+    Args:
+        error (psycopg.OperationalError): The error raised by a command.
+
+    Returns:
+        bool: True if the connection was lost (or could not be opened), False otherwise.
+    """
+
+    return (_CONN is None or _CONN.closed or _CONN.broken
+            or isinstance(error, psycopg.errors.ConnectionException))
+
+
+def _reconnect_on_error(func=None, *, retry=True):
+    """
+    This decorator opens a new connection if the persistent connection was lost while
+    running a database command. The read-only commands are then run again, only once;
+    the other ones are not, since their changes may have been committed before the
+    connection was lost (and the modifying ones would ask their prompts again), so the
+    error is only logged to the console. The other operational errors are logged too.
+    The read-only commands which already showed results (e.g. 'search') log the error
+    themselves instead of raising it, so the results are not shown twice.
+
+    Args:
+        func (function): The command using the persistent connection.
+        retry (bool): Whether the command can be run again, i.e. it is read-only.
+
+    Returns:
+        function: The wrapped command.
+    """
+
+    if func is None:
+        return functools.partial(_reconnect_on_error, retry=retry)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except psycopg.OperationalError as e:
+            if not _connection_lost(e):
+                print(f"Database 'songstorage' error: {e}")
+                return None
+            close_conn()
+            if not retry:
+                print(f"Database 'songstorage' connection error: {e}")
+                return None
+        try:
+            return func(*args, **kwargs)
+        except psycopg.OperationalError as e:
+            _log_operational_error(e)
+        return None
+
+    return wrapper
+
+
+def _log_operational_error(error):
+    """
+    This method logs an operational error of a database command which is not run again,
+    closing the persistent connection if it was lost, so the next command opens a new one.
+
+    Args:
+        error (psycopg.OperationalError): The error raised by the command.
+
+    Returns:
+        None
+    """
+
+    if _connection_lost(error):
+        close_conn()
+        print(f"Database 'songstorage' connection error: {error}")
+    else:
+        print(f"Database 'songstorage' error: {error}")
 
 
 def create_folder():
@@ -101,7 +336,7 @@ def create_folder():
     Handles any errors that may occur during folder creation.
 
     Returns:
-        None
+        bool: True if the folder exists, False otherwise.
     """
 
     folder_path = "Storage"
@@ -111,10 +346,265 @@ def create_folder():
             print("Storage folder created.")
         else:
             print("Storage folder exists.")
+        return True
     except OSError as e:
         print(f"Error creating folder '{folder_path}': {e}")
+        return False
+
+
+def setup():
+    """
+    This method sets up the database and the 'Storage' folder. The setup is done only
+    once: after it succeeds, the file 'SETUP_SENTINEL' is written and the next startups
+    skip the connection to the 'postgres' database and the setup query, as long as the
+    file holds the current 'SETUP_VERSION' and the folder exists. The file is removed if
+    the database cannot be reached later, so the setup runs again on the next startup.
+
+    Returns:
+        None
+    """
+
+    try:
+        with open(SETUP_SENTINEL) as sentinel:
+            if sentinel.read().strip() == SETUP_VERSION and os.path.isdir("Storage"):
+                return
+    except OSError:
+        pass
+
+    database_ready = database_setup()
+    folder_ready = create_folder()
+    if database_ready and folder_ready:
+        try:
+            with open(SETUP_SENTINEL, "w") as sentinel:
+                sentinel.write(SETUP_VERSION)
+        except OSError as e:
+            print(f"Error writing '{SETUP_SENTINEL}': {e}")
+
 
+def _forget_setup():
+    """
+    This method removes the file 'SETUP_SENTINEL', so the setup runs again on the next
+    startup (e.g. after the database was dropped).
+
+    Returns:
+        None
+    """
+
+    try:
+        os.remove(SETUP_SENTINEL)
+    except OSError:
+        pass
+
+
+def _storage_files(rescan=False):
+    """
+    This method returns the index of the songs of the 'Storage' folder. The folder is
+    scanned once, on first use, instead of checking each song with its own 'stat' call,
+    and then the index is kept up to date by the commands adding and deleting songs.
+    Since songs can be added to or removed from the folder by other programs, the
+    commands adding songs check the file on disk before copying it.
+
+    Args:
+        rescan (bool): Whether to scan the folder again, e.g. if a song is missing from
+            the index because it was added to the folder by another program.
+
+    Returns:
+        dict: The path of each song of the 'Storage' folder, by its file name.
+    """
+
+    global _STORAGE_INDEX
+    if _STORAGE_INDEX is None or rescan:
+        _STORAGE_INDEX = {entry.name: entry.path for entry in os.scandir("Storage")}
+    return _STORAGE_INDEX
 
+
+def _fast_copy(src, dst):
+    """
+    This method copies the file from 'src' to 'dst'. It first tries to let the kernel
+    copy the data without passing it through Python, using 'os.copy_file_range' (which
+    can also clone the file on CoW filesystems and NFS) and then 'os.sendfile'. If none
+    of them is available or they fail, the rest of the file is copied with a 'readinto'
+    loop over a 1 MiB buffer.
+
+    Args:
+        src (str): The path of the file to be copied.
+        dst (str): The path of the copy.
+
+    Returns:
+        None
+    """
+
+    with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        copied = 0
+
+        if hasattr(os, "copy_file_range"):
+            try:
+                while copied < size:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied,
+                                              copied, copied)
+                    if sent == 0:
+                        break
+                    copied += sent
+            except OSError:
+                pass
+
+        if copied < size and hasattr(os, "sendfile"):
+            try:
+                fdst.seek(copied)
+                while copied < size:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), copied, size - copied)
+                    if sent == 0:
+                        break
+                    copied += sent
+            except OSError:
+                pass
+
+        fsrc.seek(copied)
+        fdst.seek(copied)
+        buffer = memoryview(bytearray(COPY_BUFFER_SIZE))
+        while n := fsrc.readinto(buffer):
+            fdst.write(buffer[:n])
+
+
+def _import_song(src, dst):
+    """
+    This method puts a song file in the 'Storage' folder. When the file is on the same
+    filesystem as the folder, it creates a hard link to it, which takes no time and no
+    space whatever the size of the song, since no data is copied. The link is simply
+    tried: if it fails because the file is on another filesystem or the filesystem does
+    not support hard links, the file is copied with '_fast_copy'. The other errors (e.g.
+    the song is already in the folder) are raised, and the copy never overwrites a file,
+    since the existing one could be a hard link to the song itself.
+
+    Args:
+        src (str): The path of the song file.
+        dst (str): The path of the song in the 'Storage' folder.
+
+    Returns:
+        None
+    """
+
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in _COPY_INSTEAD_OF_LINK:
+            raise
+        _fast_copy(src, dst)
+
+
+def _is_valid_date(release_date):
+    """
+    This method checks a release date is a valid date in the format 'YYYY-MM-DD'.
+    The format is checked first with a precompiled regex, so malformed input is
+    rejected without parsing it, and the date itself is then checked with
+    'date.fromisoformat', which does not allocate a full 'datetime' like 'strptime'.
+
+    Args:
+        release_date (str): The release date.
+
+    Returns:
+        bool: True if the release date is valid, False otherwise.
+    """
+
+    if not _DATE_RE.fullmatch(release_date):
+        return False
+    try:
+        date.fromisoformat(release_date)
+    except ValueError:
+        return False
+    return True
+
+
+def _validate_song(song_path, artist, song_name, release_date, tags):
+    """
+    This method validates the metadata of a song before it is added. It checks the
+    given path is a valid song with one of the supported extensions, the release date
+    format, and the other args to not be NULL. The extension is checked first, so the
+    file is only looked up on disk (with a single 'os.stat') for the supported songs.
+
+    Args:
+        song_path (str): The path of the file.
+        artist (str): The name of the artist.
+        song_name (str): The name of the song.
+        release_date (str): The release date as 'YYYY-MM-DD'.
+        tags (str list): A list of tags associated with the song.
+
+    Returns:
+        str: The error message, or None if the song is valid.
+    """
+
+    if not song_path.lower().endswith(_SONG_EXT_TUPLE):
+        return "Error: The file is not a valid song."
+    try:
+        if not stat.S_ISREG(os.stat(song_path).st_mode):
+            return "Error: The file does not exist or is a directory."
+    except OSError:
+        return "Error: The file does not exist or is a directory."
+    if not _is_valid_date(release_date):
+        return "Error: Invalid date format."
+    if not artist or not song_name:
+        return "Error: Missing artist or song name."
+    if not tags or all(tag.strip() == "" for tag in tags):
+        return "Error: Missing tags."
+    return None
+
+
+def _song_length(song_path):
+    """
+    This method returns the length of a song in seconds. It reads only the header of
+    the file with `mutagen`, without decoding the audio.
+
+    Args:
+        song_path (str): The path of the file.
+
+    Returns:
+        float: The length of the song, or None if the format is not recognized.
+    """
+
+    try:
+        audio = mutagen.File(song_path)
+    except mutagen.MutagenError:
+        return None
+    return audio.info.length if audio is not None else None
+
+
+def _array_literal(values):
+    """
+    This method formats a list of strings as a PostgreSQL array literal,
+    e.g. ['rap', 'hip hop'] -> '{"rap","hip hop"}'.
+
+    Args:
+        values (str list): The values of the array.
+
+    Returns:
+        str: The array literal.
+    """
+
+    quoted = ('"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in values)
+    return "{" + ",".join(quoted) + "}"
+
+
+@functools.lru_cache(maxsize=4096)
+def _song_file(song_id):
+    """
+    This method returns the file name and the length of the song with the given ID.
+    The result is cached, so playing a song again does not query the database; the
+    cache must be cleared with '_song_file.cache_clear()' when songs are added or deleted.
+
+    Args:
+        song_id (int): The ID of the song.
+
+    Returns:
+        tuple: The file name and the length in seconds of the song, or None if there
+        is no song with this ID.
+    """
+
+    rows = _execute("SELECT file_name, duration_seconds FROM songs WHERE id = %(id)s", id=song_id)
+    return tuple(rows[0]) if rows else None
+
+
+@_reconnect_on_error(retry=False)
 def add_song(song_path, artist, song_name, release_date, tags):
     """
     This method adds a song to the 'Storage' folder and its metadata to the database.
@@ -122,6 +612,7 @@ def add_song(song_path, artist, song_name, release_date, tags):
     check the release date format, and the other args to not be NULL. Then, if these
     requirements are met, it copies the song file to the 'Storage' folder and inserts
     the metdata into the 'songs' table in the 'songstorage' database, returning the id.
+    If the metadata cannot be inserted, the song just copied is removed from the folder.
     It also logs success and error messages to the console.
 
     Args:
@@ -139,56 +630,272 @@ def add_song(song_path, artist, song_name, release_date, tags):
     """
 
     try:
-        if not os.path.isfile(song_path):
-            print("Error: The file does not exist or is a directory.")
-            return
-        if not os.path.splitext(song_path)[1].lower() in SONG_EXTENSIONS:
-            print("Error: The file is not a valid song.")
-            return
-        try:
-            datetime.strptime(release_date, "%Y-%m-%d")
-        except ValueError:
-            print("Error: Invalid date format.")
-            return
-        if not artist or not song_name:
-            print("Error: Missing artist or song name.")
-            return
-        if not tags or all(tag.strip() == "" for tag in tags):
-            print("Error: Missing tags.")
+        error = _validate_song(song_path, artist, song_name, release_date, tags)
+        if error:
+            print(error)
             return
 
-        conn = pg8000.connect(user=USER, password=PASSWORD, host=HOST, database=DB)
-        cursor = conn.cursor()
-
         storage_path = os.path.join("Storage", os.path.basename(song_path))
+        stored_paths = []
         if not os.path.exists(storage_path):
-            shutil.copy(song_path, storage_path)
+            _import_song(song_path, storage_path)
+            stored_paths.append(storage_path)
             print(f"Song '{song_path}' was added to storage.")
+        _storage_files()[os.path.basename(song_path)] = storage_path
 
-        cursor.execute(
-            """INSERT INTO songs (file_name, artist, song_name, release_date, tags) 
-            VALUES (%s, %s, %s, %s, %s) RETURNING id""",
-            (os.path.basename(song_path), artist, song_name, release_date, tags)
-        )
-        song_id = cursor.fetchone()[0]
-        conn.commit()
+        try:
+            rows = _execute(
+                """INSERT INTO songs (file_name, artist, song_name, release_date, tags, duration_seconds) 
+                VALUES (%(file_name)s, %(artist)s, %(song_name)s, %(release_date)s, %(tags)s, %(duration)s)
+                RETURNING id""",
+                file_name=os.path.basename(song_path), artist=artist, song_name=song_name,
+                release_date=release_date, tags=tags, duration=_song_length(song_path)
+            )
+        except Exception as e:
+            _undo_store(e, stored_paths)
+            raise
+        song_id = rows[0][0]
+        _song_file.cache_clear()
+        _clear_search_cache()
         print(f"Song {song_id} was added to storage.")
 
-        cursor.close()
-        conn.close()
-
-    except pg8000.dbapi.DatabaseError as e:
+    except psycopg.OperationalError:
+        raise
+    except psycopg.DatabaseError as e:
         print(f"Database 'songstorage' error: {e}")
     except Exception as e:
         print(f"Error adding song: {e}")
 
 
+def _store_songs(entries):
+    """
+    This method validates many songs like in 'add_song', skipping the invalid ones, and
+    copies the files of the valid ones to the 'Storage' folder in parallel.
+
+    Args:
+        entries (tuple list): The songs to be added, each one as a tuple of
+            (song_path, artist, song_name, release_date, tags) like in 'add_song'.
+
+    Returns:
+        tuple: The valid songs, in the same format as 'entries', and the paths of the
+            songs put in the 'Storage' folder (the ones already there are not included).
+    """
+
+    songs = []
+    for song_path, artist, song_name, release_date, tags in entries:
+        error = _validate_song(song_path, artist, song_name, release_date, tags)
+        if error:
+            print(f"{error} ({song_path})")
+        else:
+            songs.append((song_path, artist, song_name, release_date, tags))
+    if not songs:
+        print("Error: No valid song to add.")
+        return songs, []
+
+    copies = {}
+    stored = _storage_files()
+    for song_path, *_ in songs:
+        storage_path = os.path.join("Storage", os.path.basename(song_path))
+        if not os.path.exists(storage_path):
+            copies.setdefault(storage_path, song_path)
+        stored[os.path.basename(song_path)] = storage_path
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(_import_song, copies.values(), copies.keys()))
+    for song_path in copies.values():
+        print(f"Song '{song_path}' was added to storage.")
+    return songs, list(copies)
+
+
+def _remove_stored(storage_paths):
+    """
+    This method removes from the 'Storage' folder the songs which were just put there,
+    when their metadata could not be inserted into the database, so no song is left in
+    the folder without its metadata.
+
+    Args:
+        storage_paths (str list): The paths of the songs in the 'Storage' folder.
+
+    Returns:
+        None
+    """
+
+    for storage_path in storage_paths:
+        try:
+            os.remove(storage_path)
+        except OSError:
+            pass
+        _storage_files().pop(os.path.basename(storage_path), None)
+        print(f"Song '{storage_path}' was removed from storage.")
+
+
+def _undo_store(error, storage_paths):
+    """
+    This method undoes the copy of the songs put in the 'Storage' folder when their
+    metadata could not be inserted. If the connection was lost, the insert may have been
+    committed before, so the songs are kept and the cached results are cleared instead.
+
+    Args:
+        error (Exception): The error raised while inserting the metadata.
+        storage_paths (str list): The paths of the songs in the 'Storage' folder.
+
+    Returns:
+        None
+    """
+
+    if isinstance(error, psycopg.OperationalError) and _connection_lost(error):
+        _song_file.cache_clear()
+        _clear_search_cache()
+    else:
+        _remove_stored(storage_paths)
+
+
+def _analyze_songs():
+    """
+    This method analyzes the 'songs' table after a bulk import, so the statistics used by
+    the planner to choose the indexes of the searches are up to date. The import is
+    already committed, so an error (e.g. a lock or statement timeout) is only logged.
+
+    Returns:
+        None
+    """
+
+    try:
+        get_conn().execute("ANALYZE songs")
+    except psycopg.Error as e:
+        print(f"Table 'songs' was not analyzed: {e}")
+
+
+@_reconnect_on_error(retry=False)
+def add_songs(entries):
+    """
+    This method adds many songs to the 'Storage' folder and their metadata to the
+    database, like 'add_songs_bulk', but it inserts the metadata with multi-row
+    'INSERT ... VALUES (...), (...) RETURNING id' commands of at most 'BULK_PAGE_SIZE'
+    songs each, so the ids of the new songs are known, in a single transaction.
+    The commands are sent in pipeline mode, so the next page is sent while the server
+    inserts the previous one, and their results are read at the end.
+    The table is then analyzed like in 'add_songs_bulk'.
+    It also logs success and error messages to the console.
+
+    Args:
+        entries (tuple list): The songs to be added, each one as a tuple of
+            (song_path, artist, song_name, release_date, tags) like in 'add_song'.
+
+    Handles any errors that may occur during interacting with the database and any other
+    error that occur during the adding process.
+
+    Returns:
+        None(it only prints the ids of the songs inserted into the 'songs' table)
+    """
+
+    try:
+        songs, stored_paths = _store_songs(entries)
+        if not songs:
+            return
+
+        conn = get_conn()
+        try:
+            cursors = []
+            with conn.transaction(), conn.pipeline():
+                for start in range(0, len(songs), BULK_PAGE_SIZE):
+                    page = songs[start:start + BULK_PAGE_SIZE]
+                    params = []
+                    for song_path, artist, song_name, release_date, tags in page:
+                        params.extend((os.path.basename(song_path), artist, song_name, release_date,
+                                       tags, _song_length(song_path)))
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "INSERT INTO songs (file_name, artist, song_name, release_date, tags, duration_seconds) "
+                        "VALUES " + ", ".join(["(%s, %s, %s, CAST(%s AS date), %s, %s)"] * len(page)) +
+                        " RETURNING id",
+                        params
+                    )
+                    cursors.append(cursor)
+            song_ids = [row[0] for cursor in cursors for row in cursor.fetchall()]
+        except Exception as e:
+            _undo_store(e, stored_paths)
+            raise
+        _song_file.cache_clear()
+        _clear_search_cache()
+        print(f"Songs {', '.join(map(str, song_ids))} were added to storage.")
+        _analyze_songs()
+
+    except psycopg.OperationalError:
+        raise
+    except psycopg.DatabaseError as e:
+        print(f"Database 'songstorage' error: {e}")
+    except Exception as e:
+        print(f"Error adding songs: {e}")
+
+
+@_reconnect_on_error(retry=False)
+def add_songs_bulk(entries):
+    """
+    This method adds many songs at once to the 'Storage' folder and their metadata to
+    the database. Each song is validated like in 'add_song' and the invalid ones are
+    skipped. The song files are copied to the 'Storage' folder in parallel and the
+    metadata of all the songs is inserted with a single 'COPY ... FROM STDIN' command
+    instead of one 'INSERT' per song.
+    The import runs in a transaction with 'synchronous_commit' turned off, so the commit
+    does not wait for the WAL to be flushed to disk. If the server crashes right after
+    the import, the last imported songs may be lost (the database stays consistent),
+    so the command can simply be run again. The other commands keep the durable default.
+    After the import, the table is analyzed, so the statistics used by the planner to
+    choose the indexes of the searches are up to date without waiting for autovacuum.
+    It also logs success and error messages to the console.
+
+    Args:
+        entries (tuple list): The songs to be added, each one as a tuple of
+            (song_path, artist, song_name, release_date, tags) like in 'add_song'.
+
+    Handles any errors that may occur during interacting with the database and any other
+    error that occur during the adding process.
+
+    Returns:
+        None
+    """
+
+    try:
+        songs, stored_paths = _store_songs(entries)
+        if not songs:
+            return
+
+        conn = get_conn()
+        try:
+            rows = [
+                (os.path.basename(song_path), artist, song_name, release_date, tags, _song_length(song_path))
+                for song_path, artist, song_name, release_date, tags in songs
+            ]
+            with conn.transaction(), conn.cursor() as cursor:
+                cursor.execute("SET LOCAL synchronous_commit = OFF")
+                with cursor.copy(
+                    "COPY songs (file_name, artist, song_name, release_date, tags, duration_seconds) FROM STDIN"
+                ) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+        except Exception as e:
+            _undo_store(e, stored_paths)
+            raise
+        _song_file.cache_clear()
+        _clear_search_cache()
+        print(f"{len(songs)} songs were added to storage.")
+        _analyze_songs()
+
+    except psycopg.OperationalError:
+        raise
+    except psycopg.DatabaseError as e:
+        print(f"Database 'songstorage' error: {e}")
+    except Exception as e:
+        print(f"Error adding songs: {e}")
+
+
+@_reconnect_on_error(retry=False)
 def delete_song(song_id):
     """
     This method deletes a song from both the 'Storage' folder and its metadata from
-    the database. It retrieves the file name from the 'Songs' table by using the id,
-    deletes the song with the specified path from the 'Storage' folder if it exists
-    and then removes the metadata from the database 'songstorage'.
+    the database. It removes the metadata from the 'Songs' table by using the id,
+    retrieving the file name in the same query, and then deletes the song with the
+    specified path from the 'Storage' folder if it exists.
     It also logs success and error messages to the console.
 
     Args:
@@ -202,43 +909,41 @@ def delete_song(song_id):
     """
 
     try:
-        conn = pg8000.connect(user=USER, password=PASSWORD, host=HOST, database=DB)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT file_name FROM songs WHERE id = %s", (song_id,))
-        result = cursor.fetchone()
-        if not result:
+        rows = _execute("DELETE FROM songs WHERE id = %(id)s RETURNING file_name", id=song_id)
+        if not rows:
             print(f"Error: There is no song with ID {song_id}.")
             return
 
-        file_name = result[0]
+        _song_file.cache_clear()
+        _clear_search_cache()
+        file_name = rows[0][0]
         song_path = os.path.join("Storage", file_name)
 
-        if os.path.exists(song_path):
+        try:
             os.remove(song_path)
             print(f"Song '{file_name}' was deleted.")
-        else:
+        except FileNotFoundError:
             print(f"Error: Song '{file_name}' not found.")
+        _storage_files().pop(file_name, None)
 
-        cursor.execute("DELETE FROM songs WHERE id = %s", (song_id,))
-        conn.commit()
         print(f"Song {song_id} was deleted.")
 
-        cursor.close()
-        conn.close()
-
-    except pg8000.dbapi.DatabaseError as e:
+    except psycopg.OperationalError:
+        raise
+    except psycopg.DatabaseError as e:
         print(f"Database 'songstorage' error: {e}")
     except Exception as e:
         print(f"Error deleting song: {e}")
 
 
+@_reconnect_on_error(retry=False)
 def modify_data(song_id):
     """
     This method modifies the metadata of a song in the database 'songstorage'.
     It retrieves the current song data from the 'Songs' table by the song ID and
     allows the user to insert new values or to keep the same values if Enter is
-    pressed. Then, it updates the song metadata in the database 'songstorage'.
+    pressed. Then, it updates only the changed columns of the song metadata in the
+    database 'songstorage', skipping the update if nothing was changed.
     It also logs success and error messages to the console.
 
     Args:
@@ -252,44 +957,272 @@ def modify_data(song_id):
     """
 
     try:
-        conn = pg8000.connect(user=USER, password=PASSWORD, host=HOST, database=DB)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM songs WHERE id = %s", (song_id,))
-        result = cursor.fetchone()
-        if not result:
+        rows = _execute("SELECT artist, song_name, release_date, tags FROM songs WHERE id = %(id)s", id=song_id)
+        if not rows:
             print(f"Error: There is no song with ID {song_id}.")
             return
+        result = SongMetadata._make(rows[0])
 
         print("Enter new value or press enter to not modify:")
-        artist = input(f"Artist [{result[2]}]: ").strip() or result[2]
-        song_name = input(f"Song Name [{result[3]}]: ").strip() or result[3]
-        release_date = input(f"Release Date [{result[4]}]: ").strip() or result[4]
-        try:
-            if release_date and release_date != result[4]:
-                datetime.strptime(release_date, "%Y-%m-%d")
-        except ValueError:
+        artist = _ask(f"Artist [{result.artist}]: ").strip() or result.artist
+        song_name = _ask(f"Song Name [{result.song_name}]: ").strip() or result.song_name
+        release_date = _ask(f"Release Date [{result.release_date}]: ").strip()
+        if release_date and not _is_valid_date(release_date):
             print("Error: Invalid date format.")
             return
-        tags_input = input(f"Tags separated by ',' [{', '.join(result[5])}]: ").strip()
-        tags = tags_input.split(',') if tags_input else result[5]
-
-        cursor.execute(
-            """UPDATE songs SET artist = %s, song_name = %s, release_date = %s, tags = %s WHERE id = %s""",
-            (artist, song_name, release_date, tags, song_id)
-        )
-        conn.commit()
-        print(f"Song {song_id} was updated.")
+        release_date = date.fromisoformat(release_date) if release_date else result.release_date
+        tags_input = _ask(f"Tags separated by ',' [{', '.join(result.tags)}]: ").strip()
+        tags = tags_input.split(',') if tags_input else result.tags
+
+        changes = {
+            column: value
+            for column, value in zip(SongMetadata._fields, (artist, song_name, release_date, tags))
+            if value != getattr(result, column)
+        }
+        if not changes:
+            print(f"Song {song_id} was not changed.")
+            return
 
-        cursor.close()
-        conn.close()
+        assignments = ", ".join(f"{column} = %({column})s" for column in changes)
+        rows = _execute(f"UPDATE songs SET {assignments} WHERE id = %(id)s RETURNING id", id=song_id, **changes)
+        if not rows:
+            print(f"Error: There is no song with ID {song_id}.")
+            return
+        _clear_search_cache()
+        print(f"Song {song_id} was updated.")
 
-    except pg8000.dbapi.DatabaseError as e:
+    except psycopg.OperationalError:
+        raise
+    except psycopg.DatabaseError as e:
         print(f"Database 'songstorage' error: {e}")
     except Exception as e:
         print(f"Error modifying song data: {e}")
 
 
+@_reconnect_on_error(retry=False)
+def modify_data_bulk(changes):
+    """
+    This method modifies the metadata of many songs at once in the database 'songstorage'.
+    The new values are sent as a 'VALUES' list joined to the 'songs' table by a single
+    'UPDATE' statement for every 1000 songs, instead of one 'UPDATE' per song. The
+    statements are sent in pipeline mode, without waiting for the result of each one.
+    The changes with an invalid release date are skipped.
+    It also logs success and error messages to the console.
+
+    Args:
+        changes (dict list): The new metadata of each song, as dicts with the keys 'id',
+            'artist', 'song_name', 'release_date' (as 'YYYY-MM-DD') and 'tags'.
+
+    Handles any errors that may occur during interacting with the database and any other
+    error that occur during the modifying process.
+
+    Returns:
+        None
+    """
+
+    try:
+        rows = []
+        for change in changes:
+            if _is_valid_date(change["release_date"]):
+                rows.append((change["id"], change["artist"], change["song_name"],
+                             change["release_date"], change["tags"]))
+            else:
+                print(f"Error: Invalid date format for song {change['id']}.")
+
+        conn = get_conn()
+        cursors = []
+        with conn.pipeline():
+            for start in range(0, len(rows), BULK_PAGE_SIZE):
+                page = rows[start:start + BULK_PAGE_SIZE]
+                values = ", ".join(["(%s::int, %s, %s, %s::date, %s::text[])"] * len(page))
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""UPDATE songs SET artist = v.artist, song_name = v.song_name,
+                    release_date = v.release_date, tags = v.tags
+                    FROM (VALUES {values}) AS v (id, artist, song_name, release_date, tags)
+                    WHERE songs.id = v.id RETURNING songs.id""",
+                    [value for row in page for value in row]
+                )
+                cursors.append(cursor)
+        updated = {row[0] for cursor in cursors for row in cursor.fetchall()}
+        _clear_search_cache()
+
+        for row in rows:
+            if row[0] not in updated:
+                print(f"Error: There is no song with ID {row[0]}.")
+        print(f"{len(updated)} songs were updated.")
+
+    except psycopg.OperationalError:
+        raise
+    except psycopg.DatabaseError as e:
+        print(f"Database 'songstorage' error: {e}")
+    except Exception as e:
+        print(f"Error modifying songs data: {e}")
+
+
+def _search_page(columns, where, params, after):
+    """
+    This method reads one page of the results of a search, i.e. at most 'FETCH_SIZE' rows
+    with an ID greater than 'after', ordered by ID. The page is read with a statement
+    prepared once per connection for each combination of columns and criteria.
+
+    Args:
+        columns (str): The columns to select, the first one being 'id'.
+        where (str): The WHERE clause built by '_build_where'.
+        params (tuple): The params of the WHERE clause, as sorted (name, value) pairs.
+        after (int): The last ID of the previous page, 0 for the first page.
+
+    Returns:
+        tuple: The rows of the page.
+    """
+
+    return tuple(_execute(
+        f"SELECT {columns} FROM songs WHERE {where} AND id > %(after)s ORDER BY id LIMIT {FETCH_SIZE}",
+        after=after, **dict(params)
+    ))
+
+
+@functools.lru_cache(maxsize=256)
+def _search_count(where, params, period):
+    """
+    This method counts the results of a search. The counts are cached (they are only
+    needed for the searches of more than one page, which are not cached themselves).
+
+    Args:
+        where (str): The WHERE clause built by '_build_where'.
+        params (tuple): The params of the WHERE clause, as sorted (name, value) pairs.
+        period (int): The current period of 'SEARCH_CACHE_TTL' seconds.
+
+    Returns:
+        int: The number of songs matching the criteria.
+    """
+
+    return _execute(f"SELECT COUNT(*) FROM songs WHERE {where}", **dict(params))[0][0]
+
+
+def _clear_search_cache():
+    """
+    This method clears the cached results of the searches, after songs are added,
+    modified or deleted.
+
+    Returns:
+        None
+    """
+
+    _SEARCH_CACHE.clear()
+    _search_count.cache_clear()
+
+
+def _cache_search(key, period, rows):
+    """
+    This method caches the results of a search holding a single page. The results of
+    the previous periods of 'SEARCH_CACHE_TTL' seconds are dropped first, then the oldest
+    ones if 'SEARCH_CACHE_SIZE' results are already cached.
+
+    Args:
+        key (tuple): The columns, the WHERE clause and the sorted params of the search.
+        period (int): The current period of 'SEARCH_CACHE_TTL' seconds.
+        rows (tuple): The rows of the results.
+
+    Returns:
+        None
+    """
+
+    for old_key, (old_period, _) in list(_SEARCH_CACHE.items()):
+        if old_period != period:
+            del _SEARCH_CACHE[old_key]
+    if len(_SEARCH_CACHE) >= SEARCH_CACHE_SIZE:
+        del _SEARCH_CACHE[next(iter(_SEARCH_CACHE))]
+    _SEARCH_CACHE[key] = (period, rows)
+
+
+def _search_pages(columns, where, params):
+    """
+    This method runs a search and yields the matching rows in pages of 'FETCH_SIZE' rows,
+    ordered by ID. Each page starts after the last ID of the previous one, so the memory
+    used stays bounded whatever the number of rows. The results holding a single page are
+    cached for the current period of 'SEARCH_CACHE_TTL' seconds, so repeating a small
+    search does not query the database; the bigger ones are never kept in memory.
+
+    Args:
+        columns (str): The columns to select, the first one being 'id'.
+        where (str): The WHERE clause built by '_build_where'.
+        params (dict): The params of the WHERE clause.
+
+    Returns:
+        generator: The lists of rows, the last one being possibly shorter.
+    """
+
+    params = tuple(sorted(params.items()))
+    key = (columns, where, params)
+    period = int(time.monotonic() // SEARCH_CACHE_TTL)
+    cached = _SEARCH_CACHE.get(key)
+    if cached is not None and cached[0] == period:
+        if cached[1]:
+            yield cached[1]
+        return
+
+    after = 0
+    while True:
+        rows = _search_page(columns, where, params, after)
+        if after == 0 and len(rows) < FETCH_SIZE:
+            _cache_search(key, period, rows)
+        if rows:
+            yield rows
+        if len(rows) < FETCH_SIZE:
+            break
+        after = rows[-1][0]
+
+
+@functools.lru_cache(maxsize=64)
+def _where_clause(keys):
+    """
+    This method joins the SQL conditions of the given criteria keys into a WHERE clause,
+    the param of each condition being named after its position ('%(p0)s', '%(p1)s', ...).
+    The clause only depends on the keys, so it is cached for each combination of them.
+
+    Args:
+        keys (str tuple): The criteria keys, sorted.
+
+    Returns:
+        str: The WHERE clause, e.g. "artist ILIKE %(p0)s AND release_date = %(p1)s".
+    """
+
+    return " AND ".join(_CRITERIA[key][0].format(f"%(p{i})s") for i, key in enumerate(keys))
+
+
+def _build_where(criteria):
+    """
+    This method parses the search criteria, each criterion being comma-separated in the
+    format 'key=value', into a WHERE clause and its params. The invalid keys are logged
+    to the console and ignored. The 'tags' criterion can hold many tags separated by '|'
+    and matches the songs having any of them, with a single lookup in the index of
+    'tags'. The criteria are sorted by key, so the same criteria given in another order
+    produce the same clause (and reuse its prepared statement).
+
+    Args:
+        criteria (str): Comma-separated criteria, e.g. "artist=Queen, tags=rap".
+
+    Returns:
+        tuple: The WHERE clause (None if there is no valid criterion) and the dict of params.
+    """
+
+    parsed = []
+    for criterion in _CRITERIA_SEPARATOR.split(criteria.strip()):
+        key, value = _VALUE_SEPARATOR.split(criterion)
+        if key.lower() in _CRITERIA:
+            parsed.append((key.lower(), _CRITERIA[key.lower()][1](value)))
+        else:
+            print(f"Error: Invalid criterion '{key}'.")
+
+    if not parsed:
+        return None, {}
+    parsed.sort(key=lambda item: item[0])
+    params = {f"p{i}": value for i, (_, value) in enumerate(parsed)}
+    return _where_clause(tuple(key for key, _ in parsed)), params
+
+
+@_reconnect_on_error
 def search(criteria):
     """
     This method searches for songs in the database 'songstorage' based on specified
@@ -308,68 +1241,150 @@ def search(criteria):
         None
     """
 
+    shown = False
     try:
-        conn = pg8000.connect(user=USER, password=PASSWORD, host=HOST, database=DB)
-        cursor = conn.cursor()
-
-        query = "SELECT * FROM songs WHERE "
-        params = []
-        conditions = []
-
-        for criterion in criteria.split(','):
-            key, value = map(str.strip, criterion.split('='))
-            if key.lower() == "artist":
-                conditions.append("artist ILIKE %s")
-                params.append(f"%{value}%")
-            elif key.lower() == "song_name":
-                conditions.append("song_name ILIKE %s")
-                params.append(f"%{value}%")
-            elif key.lower() == "release_date":
-                conditions.append("release_date = %s")
-                params.append(value)
-            elif key.lower() == "tags":
-                conditions.append("%s = ANY(tags)")
-                params.append(value)
-            elif key.lower() == "file_name":
-                conditions.append("file_name ILIKE %s")
-                params.append(f"%{value}%")
-            else:
-                print(f"Error: Invalid criterion '{key}'.")
-
-        if conditions:
-            query += " AND ".join(conditions)
-        else:
+        where, params = _build_where(criteria)
+        if where is None:
             print("Error: Invalid criteria.")
             return
-
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-
-        if results:
-            print(f"Results found - {len(results)}:")
-            for row in results:
-                print(
-                    f"ID: {row[0]}, File_name: {row[1]}, Artist: {row[2]},"
-                    f" Song_name: {row[3]}, Release_date: {row[4]}, Tags: {', '.join(row[5])}"
-                )
-        else:
+        pages = _search_pages(", ".join(Song._fields), where, params)
+        first = next(pages, None)
+        if first is None:
             print("Error: No song found.")
+            return
 
-        cursor.close()
-        conn.close()
-
-    except pg8000.dbapi.DatabaseError as e:
+        if len(first) < FETCH_SIZE:
+            total = len(first)
+        else:
+            total = _search_count(where, tuple(sorted(params.items())),
+                                  int(time.monotonic() // SEARCH_CACHE_TTL))
+        print(f"Results found - {total}:")
+        shown = True
+        for rows in chain([first], pages):
+            sys.stdout.write("".join(
+                _ROW_FMT(*row[:5], ", ".join(row[5])) for row in rows
+            ))
+
+    except psycopg.OperationalError as e:
+        if not shown:
+            raise
+        _log_operational_error(e)
+    except psycopg.DatabaseError as e:
         print(f"Database 'songstorage' error: {e}")
     except Exception as e:
         print(f"Error searching for song: {e}")
 
 
+def _read_for_archive(path, file_name):
+    """
+    This method reads a song file to be written to a ZIP archive. The songs bigger than
+    'ARCHIVE_READ_LIMIT' are not read, so they can be streamed to the archive instead of
+    being held in memory.
+
+    Args:
+        path (str): The path of the song file.
+        file_name (str): The name of the song inside the archive.
+
+    Returns:
+        tuple: The path, the 'ZipInfo' of the song and its content as bytes (None if
+            it is too big).
+    """
+
+    zinfo = zipfile.ZipInfo.from_file(path, arcname=file_name)
+    if zinfo.file_size > ARCHIVE_READ_LIMIT:
+        return path, zinfo, None
+    with open(path, "rb") as file:
+        return path, zinfo, file.read()
+
+
+def _copy_search(columns, where, params):
+    """
+    This method reads all the results of a search with a single
+    'COPY (SELECT ...) TO STDOUT' command, which streams the rows in one block instead
+    of decoding them one by one like the pages read by '_search_pages'. 'COPY' does not
+    accept server-side params, so psycopg quotes them and merges them into the query.
+    The rows are yielded in batches of 'FETCH_SIZE' as they arrive, so the memory used
+    stays bounded; no other query can be sent on the connection until they are all read.
+    The values are not parsed, they are returned as they are written by 'COPY'.
+
+    Args:
+        columns (str): The columns to select, the first one being 'id'.
+        where (str): The WHERE clause built by '_build_where'.
+        params (dict): The params of the WHERE clause.
+
+    Returns:
+        generator: The lists of rows, each row being a tuple of strings, ordered by ID.
+    """
+
+    with get_conn().cursor() as cursor:
+        with cursor.copy(f"COPY (SELECT {columns} FROM songs WHERE {where} ORDER BY id) TO STDOUT",
+                         params) as copy:
+            rows = copy.rows()
+            while batch := list(islice(rows, FETCH_SIZE)):
+                yield batch
+
+
+def _stored_songs(batches):
+    """
+    This method yields the songs of the given batches of rows which are in the 'Storage'
+    folder, looking them up in the index of the folder. The first time a song is missing,
+    the folder is scanned again in case the index is out of date, and the songs which are
+    still missing are logged to the console.
+
+    Args:
+        batches (iterable): The lists of rows, each row holding an ID and a file name.
+
+    Returns:
+        generator: The path and the file name of each stored song.
+    """
+
+    stored = _storage_files()
+    rescanned = False
+    for rows in batches:
+        for _, file_name in rows:
+            if file_name not in stored and not rescanned:
+                stored = _storage_files(rescan=True)
+                rescanned = True
+            if file_name in stored:
+                yield stored[file_name], file_name
+            else:
+                print(f"Error: There is no song {file_name}.")
+
+
+def _prefetch(func, items, workers=8):
+    """
+    This method calls 'func' for each tuple of args in 'items' in a thread pool and yields
+    the results in order. At most 'workers' results are computed ahead of the one being
+    consumed, so at most 'workers + 1' results are held in memory at once.
+
+    Args:
+        func (function): The function to be called.
+        items (tuple list): The args of each call.
+        workers (int): The number of threads.
+
+    Returns:
+        generator: The results of the calls, in the order of 'items'.
+    """
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for args in items:
+            pending.append(executor.submit(func, *args))
+            if len(pending) > workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+@_reconnect_on_error
 def create_save_list(archive_path, criteria):
     """
     This method creates a ZIP archive containing songs that match the search criteria.
     It retrieves songs based on the criteria and saves them to a ZIP archive created at
     the specified path. The function supports the same searching style as the 'search'
     method and the archive is created if at least one song is found.
+    The songs are stored without compression, since audio files are already compressed,
+    and they are read from the 'Storage' folder in parallel threads.
     It also logs success and error messages to the console.
 
     Args:
@@ -383,73 +1398,75 @@ def create_save_list(archive_path, criteria):
         None
     """
 
+    shown = False
     try:
-        conn = pg8000.connect(user=USER, password=PASSWORD, host=HOST, database=DB)
-        cursor = conn.cursor()
-
-        query = "SELECT file_name FROM songs WHERE "
-        params = []
-        conditions = []
-
-        for criterion in criteria.split(','):
-            key, value = map(str.strip, criterion.split('='))
-            if key.lower() == "artist":
-                conditions.append("artist ILIKE %s")
-                params.append(f"%{value}%")
-            elif key.lower() == "song_name":
-                conditions.append("song_name ILIKE %s")
-                params.append(f"%{value}%")
-            elif key.lower() == "release_date":
-                conditions.append("release_date = %s")
-                params.append(value)
-            elif key.lower() == "tags":
-                conditions.append("%s = ANY(tags)")
-                params.append(value)
-            elif key.lower() == "file_name":
-                conditions.append("file_name ILIKE %s")
-                params.append(f"%{value}%")
-            else:
-                print(f"Error: Invalid criterion '{key}'.")
-
-        if conditions:
-            query += " AND ".join(conditions)
-        else:
+        where, params = _build_where(criteria)
+        if where is None:
             print("Error: Invalid criteria.")
             return
-
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-
-        if results:
-            with zipfile.ZipFile(archive_path, 'w') as zipf:
-                for row in results:
-                    file_name = row[0]
-                    file_path = os.path.join("Storage", file_name)
-                    if os.path.exists(file_path):
-                        zipf.write(file_path, arcname=file_name)
-                        print(f"Song '{file_name}' was added to archive.")
-                    else:
-                        print(f"Error: There is no song {file_name}.")
-
-            print(f"Archive '{archive_path}' was created.")
-        else:
+        batches = _copy_search("id, file_name", where, params)
+        first = next(batches, None)
+        if first is None:
             print("Error: No song found.")
+            return
 
-        cursor.close()
-        conn.close()
-
-    except pg8000.dbapi.DatabaseError as e:
+        shown = True
+        try:
+            with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zipf:
+                songs = _stored_songs(chain([first], batches))
+                for path, zinfo, data in _prefetch(_read_for_archive, songs):
+                    if data is None:
+                        with open(path, "rb") as src, zipf.open(zinfo, 'w') as dst:
+                            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                    else:
+                        zipf.writestr(zinfo, data)
+                    print(f"Song '{zinfo.filename}' was added to archive.")
+        finally:
+            batches.close()
+
+        print(f"Archive '{archive_path}' was created.")
+
+    except psycopg.OperationalError as e:
+        if not shown:
+            raise
+        _log_operational_error(e)
+    except psycopg.DatabaseError as e:
         print(f"Database 'songstorage' error: {e}")
     except Exception as e:
         print(f"Error creating save_list: {e}")
 
 
+def _seek(position):
+    """
+    This method moves the playback of the loaded song to the given position. It seeks
+    within the loaded stream with 'set_pos' and, for the formats which do not support
+    it (e.g. WAV), it restarts the song at the given position. Since 'set_pos' is
+    relative to the current position for MP3, the song is rewound to its start first,
+    so the position is absolute for every format.
+
+    Args:
+        position (float): The position in seconds from the start of the song.
+
+    Returns:
+        None
+    """
+
+    try:
+        pygame.mixer.music.rewind()
+        pygame.mixer.music.set_pos(position)
+    except pygame.error:
+        pygame.mixer.music.stop()
+        pygame.mixer.music.play(start=position)
+
+
+@_reconnect_on_error
 def play_song(song_id):
     """
     This method plays the song with the ID given by retrieving the file name from the
     database 'songstorage' using `pygame`. It also allows the user to rewind or forward
     the song by 10 seconds using left and right arrow keys and to stop the playback
-    using the ESC key.
+    using the ESC key. The playback loop blocks until the next key press or the end of
+    the song, instead of polling for events.
     It also logs success and error messages to the console.
 
     Args:
@@ -463,19 +1480,19 @@ def play_song(song_id):
     """
 
     try:
-        conn = pg8000.connect(user=USER, password=PASSWORD, host=HOST, database=DB)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT file_name FROM songs WHERE id = %s", (song_id,))
-        result = cursor.fetchone()
-        if not result:
+        song = _song_file(song_id)
+        if song is None:
             print(f"Error: There is no song with ID {song_id}.")
             return
 
-        file_name = result[0]
-        song_path = os.path.join("Storage", file_name)
+        file_name, song_length = song
+        song_path = _storage_files().get(file_name) or _storage_files(rescan=True).get(file_name)
+
+        if song_path is not None:
+            if song_length is None:
+                song_length = _song_length(song_path)
 
-        if os.path.exists(song_path):
+            pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=512)
             pygame.init()
             window_size = (700, 350)
             pygame.display.set_mode(window_size)
@@ -483,122 +1500,371 @@ def play_song(song_id):
 
             pygame.mixer.init()
             pygame.mixer.music.load(song_path)
+            end_event = pygame.USEREVENT + 1
+            pygame.mixer.music.set_endevent(end_event)
             pygame.mixer.music.play()
 
-            song_length = pygame.mixer.Sound(song_path).get_length()
             print(f"Playing '{file_name}'. Press left/right arrow keys to rewind/forward and ESC to stop.")
 
             start_time = time.time()
             running = True
             while running:
-                for event in pygame.event.get():
-                    if event.type == pygame.KEYDOWN:
-                        passed_time = (time.time() - start_time) + pygame.mixer.music.get_pos() / 1000.0
-                        if event.key == pygame.K_LEFT:
-                            rewind_to = max(0, passed_time - 10)
+                event = pygame.event.wait()
+                if event.type == end_event:
+                    # Also posted when the song is stopped to be restarted at another position
+                    if not pygame.mixer.music.get_busy():
+                        print("Song finished playing.")
+                        running = False
+                elif event.type == pygame.KEYDOWN:
+                    passed_time = time.time() - start_time
+                    if event.key == pygame.K_LEFT:
+                        rewind_to = max(0, passed_time - 10)
+                        _seek(rewind_to)
+                        start_time = time.time() - rewind_to
+                    elif event.key == pygame.K_RIGHT:
+                        forward_to = passed_time + 10
+                        if song_length is not None and forward_to >= song_length:
                             pygame.mixer.music.stop()
-                            pygame.mixer.music.play(start=rewind_to)
-                            start_time = time.time() - rewind_to
-                        elif event.key == pygame.K_RIGHT:
-                            forward_to = passed_time + 10
-                            if forward_to >= song_length:
-                                print("Song finished playing.")
+                            print("Song finished playing.")
+                            running = False
+                        else:
+                            try:
+                                _seek(forward_to)
+                                start_time = time.time() - forward_to
+                            except pygame.error:
                                 pygame.mixer.music.stop()
+                                print("Song finished playing.")
                                 running = False
-                            else:
-                                pygame.mixer.music.stop()
-                                pygame.mixer.music.play(start=forward_to)
-                                start_time = time.time() - forward_to
-                        elif event.key == pygame.K_ESCAPE:
-                            pygame.mixer.music.stop()
-                            print("Song stopped playing.")
-                            running = False
-                pygame.time.wait(100)
+                    elif event.key == pygame.K_ESCAPE:
+                        pygame.mixer.music.stop()
+                        print("Song stopped playing.")
+                        running = False
 
             pygame.quit()
         else:
             print(f"Error: There is no song {file_name}.")
 
-        cursor.close()
-        conn.close()
-
-    except pg8000.dbapi.DatabaseError as e:
+    except psycopg.OperationalError:
+        raise
+    except psycopg.DatabaseError as e:
         print(f"Database 'songstorage' error: {e}")
     except Exception as e:
         print(f"Error playing song: {e}")
 
 
+def _ask(prompt):
+    """
+    This method reads a line typed by the user. If a script is being run by the
+    'run_script' command, the next line of the script is used instead and echoed
+    to the console.
+
+    Args:
+        prompt (str): The message shown to the user.
+
+    Returns:
+        str: The line read.
+    """
+
+    if _PENDING_INPUT:
+        line = _PENDING_INPUT.popleft()
+        print(prompt + line)
+        return line
+    return input(prompt)
+
+
+def _ask_id(arg=""):
+    """
+    This method reads a song ID, from the args of the command if it was given there,
+    or typed by the user otherwise.
+    It also logs an error message to the console if the ID is not valid.
+
+    Args:
+        arg (str): The args of the command.
+
+    Returns:
+        int: The song ID, or None if it is not valid.
+    """
+
+    song_id = arg.strip() or _ask("Enter song ID: ").strip()
+    if song_id.isdigit():
+        return int(song_id)
+    print("Error: Invalid ID.")
+    return None
+
+
+def _split_args(arg, count):
+    """
+    This method splits the args of a command like a shell would, so the args holding
+    spaces can be quoted (e.g. add_song "My Song.mp3" Queen ...).
+    It also logs an error message to the console if the number of args is wrong.
+
+    Args:
+        arg (str): The args of the command.
+        count (int): The number of args expected.
+
+    Returns:
+        str list: The args, or None if they are not valid.
+    """
+
+    try:
+        args = shlex.split(arg)
+    except ValueError as e:
+        print(f"Error: Invalid args: {e}")
+        return None
+    if len(args) != count:
+        print(f"Error: Expected {count} args, type 'help'.")
+        return None
+    return args
+
+
+class SongStorageShell(cmd.Cmd):
+    """
+    This class is the interactive loop of the SongStorage application. Each command can
+    be typed with its args on the same line, or alone, in which case its args are asked
+    one by one. When the input is not a terminal (e.g. commands piped from a file), the
+    lines are read directly from the input, without the overhead of readline.
+    """
+
+    prompt = "Enter command: "
+
+    def __init__(self):
+        """
+        This method creates the loop, using readline (history and completion of the
+        commands with Tab) only if the input is a terminal.
+        """
+
+        interactive = sys.stdin.isatty()
+        super().__init__(completekey="tab" if interactive else None)
+        self.use_rawinput = interactive
+
+    def precmd(self, line):
+        """
+        This method makes the command names case-insensitive, keeping the case of the args.
+
+        Args:
+            line (str): The line typed.
+
+        Returns:
+            str: The line with the command name lowercased.
+        """
+
+        if line == "EOF":
+            return line
+        command, _, arg = line.strip().partition(" ")
+        return f"{command.lower()} {arg}"
+
+    def postcmd(self, stop, line):
+        """
+        This method queues the next line of the script being run by 'run_script', if any,
+        echoing it to the console like the other lines of the script.
+
+        Args:
+            stop (bool): Whether the loop must stop.
+            line (str): The line of the command run.
+
+        Returns:
+            bool: Whether the loop must stop.
+        """
+
+        if not stop and _PENDING_INPUT and not self.cmdqueue:
+            line = _PENDING_INPUT.popleft()
+            print(self.prompt + line)
+            self.cmdqueue.append(line)
+        return stop
+
+    def emptyline(self):
+        """
+        This method logs that an empty line is not a valid command.
+        """
+
+        self.default("")
+
+    def default(self, line):
+        """
+        This method logs that the command typed is not valid.
+
+        Args:
+            line (str): The line typed.
+        """
+
+        print("Error: Invalid command, type 'help'.")
+
+    def do_help(self, arg):
+        """
+        This method displays the list of available commands.
+        """
+
+        print("Available commands:\n"
+              "- Add_song <path> <artist> <song_name> <release_date> <tags>\n"
+              "- Bulk_add <directory> <artist> <release_date> <tags>\n"
+              "- Delete_song <id>\n"
+              "- Modify_data <id>\n"
+              "- Search <criteria>\n"
+              "- Create_save_list <path> <criteria>\n"
+              "- Play <id>\n"
+              "- Run_script <path>\n"
+              "- Quit\n"
+              "The args can be omitted to be asked one by one; quote the ones holding spaces.")
+
+    def do_add_song(self, arg):
+        """
+        This method reads the path and the metadata of a song and adds it.
+        """
+
+        if arg.strip():
+            args = _split_args(arg, 5)
+            if args is None:
+                return
+            song_path, artist, song_name, release_date, tags = args
+        else:
+            song_path = _ask("Enter path: ").strip()
+            artist = _ask("Enter artist: ").strip()
+            song_name = _ask("Enter song name: ").strip()
+            release_date = _ask("Enter release date <YYYY-MM-DD>: ").strip()
+            tags = _ask("Enter tags separated by ',': ").strip()
+        add_song(song_path, artist, song_name, release_date, tags.split(','))
+
+    def do_bulk_add(self, arg):
+        """
+        This method reads a directory and the metadata shared by its songs and adds them all.
+        """
+
+        if arg.strip():
+            args = _split_args(arg, 4)
+            if args is None:
+                return
+            directory, artist, release_date, tags = args
+        else:
+            directory = _ask("Enter directory path: ").strip()
+            artist = _ask("Enter artist: ").strip()
+            release_date = _ask("Enter release date <YYYY-MM-DD>: ").strip()
+            tags = _ask("Enter tags separated by ',': ").strip()
+        if os.path.isdir(directory):
+            entries = [
+                (entry.path, artist, os.path.splitext(entry.name)[0], release_date, tags.split(','))
+                for entry in os.scandir(directory)
+                if entry.is_file() and entry.name.lower().endswith(_SONG_EXT_TUPLE)
+            ]
+            add_songs_bulk(entries)
+        else:
+            print("Error: The directory does not exist.")
+
+    def do_delete_song(self, arg):
+        """
+        This method reads a song ID and deletes the song.
+        """
+
+        song_id = _ask_id(arg)
+        if song_id is not None:
+            delete_song(song_id)
+
+    def do_modify_data(self, arg):
+        """
+        This method reads a song ID and modifies the metadata of the song.
+        """
+
+        song_id = _ask_id(arg)
+        if song_id is not None:
+            modify_data(song_id)
+
+    def do_search(self, arg):
+        """
+        This method reads search criteria and searches for songs.
+        """
+
+        criteria = arg.strip() or _ask("Enter search criteria (e.g., artist=Kanye, song_name=Wolves): ").strip()
+        search(criteria)
+
+    def do_create_save_list(self, arg):
+        """
+        This method reads an archive path and search criteria and creates the save list.
+        """
+
+        if arg.strip():
+            args = _split_args(arg, 2)
+            if args is None:
+                return
+            archive_path, criteria = args
+        else:
+            archive_path = _ask("Enter archive path: ").strip()
+            criteria = _ask("Enter search criteria (e.g., artist=Kanye, song_name=Wolves): ").strip()
+        create_save_list(archive_path, criteria)
+
+    def do_play(self, arg):
+        """
+        This method reads a song ID and plays the song.
+        """
+
+        song_id = _ask_id(arg)
+        if song_id is not None:
+            play_song(song_id)
+
+    def do_run_script(self, arg):
+        """
+        This method reads the path of a script and runs it. A script holds the lines that
+        would be typed in the console, i.e. each command, followed by the answers to its
+        prompts if its args are not on the same line, so many operations can be done
+        without typing them one by one.
+        """
+
+        script_path = arg.strip() or _ask("Enter script path: ").strip()
+        try:
+            with open(script_path) as script:
+                lines = script.read().splitlines()
+        except OSError as e:
+            print(f"Error reading script '{script_path}': {e}")
+            return
+        _PENDING_INPUT.extendleft(reversed(lines))
+
+    def do_quit(self, arg):
+        """
+        This method exits the application.
+
+        Returns:
+            bool: True, to stop the loop.
+        """
+
+        return True
+
+    def do_EOF(self, arg):
+        """
+        This method exits the application at the end of the input (Ctrl-D or the end of
+        the piped commands).
+
+        Returns:
+            bool: True, to stop the loop.
+        """
+
+        print()
+        return True
+
+
 def main():
     """
     Main method for the SongStorage application.
-    This method sets up the database and storage folder, then provides an interactive loop
+    This method sets up the database and storage folder, then runs the interactive loop
     where the user can manage their music library by adding, deleting, modifying, searching,
     playing songs and creating save lists by typing different commands.
 
     Commands:
         - help: Display the list of available commands.
         - add_song: Add a song to the storage and its metadata to the database.
+        - bulk_add: Add all the songs of a directory, sharing the same metadata.
         - delete_song: Delete a song and its metadata using its ID.
         - modify_data: Modify metadata for a song using its ID.
-        - search: Search for songs based on criteria (e.g. "artist=Queen, tags=rap").
+        - search: Search for songs based on criteria (e.g. "artist=Queen, tags=rap|pop").
         - create_save_list: Create an archive of songs based on specified criteria.
         - play: Play a song using its ID.
+        - run_script: Run the commands written in a file, as if they were typed.
         - quit: Exit the application.
 
     Returns:
         None
     """
 
-    database_setup()
-    create_folder()
-
-    print("SongStorage: type 'help' to see the available commands.")
-    command = ""
-    while command.lower().strip() != "quit":
-        command = input("Enter command: ").lower().strip()
-        if command == "help":
-            print("Available commands:\n"
-                  "- Add_song <path> <metadata>\n"
-                  "- Delete_song <id>\n"
-                  "- Modify_data <id>\n"
-                  "- Search <criteria>\n"
-                  "- Create_save_list <criteria>\n"
-                  "- Play <id>\n"
-                  "- Quit")
-        elif command == "add_song":
-            song_path = input("Enter path: ").strip()
-            artist = input("Enter artist: ").strip()
-            song_name = input("Enter song name: ").strip()
-            release_date = input("Enter release date <YYYY-MM-DD>: ").strip()
-            tags = input("Enter tags separated by ',': ").strip().split(',')
-            add_song(song_path, artist, song_name, release_date, tags)
-        elif command == "delete_song":
-            song_id = input("Enter song ID: ").strip()
-            if song_id.isdigit():
-                delete_song(int(song_id))
-            else:
-                print("Error: Invalid ID.")
-        elif command == "modify_data":
-            song_id = input("Enter song ID: ").strip()
-            if song_id.isdigit():
-                modify_data(int(song_id))
-            else:
-                print("Error: Invalid ID.")
-        elif command == "search":
-            criteria = input("Enter search criteria (e.g., artist=Kanye, song_name=Wolves): ").strip()
-            search(criteria)
-        elif command == "create_save_list":
-            archive_path = input("Enter archive path: ").strip()
-            criteria = input("Enter search criteria (e.g., artist=Kanye, song_name=Wolves): ").strip()
-            create_save_list(archive_path, criteria)
-        elif command == "play":
-            song_id = input("Enter song ID: ").strip()
-            if song_id.isdigit():
-                play_song(int(song_id))
-            else:
-                print("Error: Invalid ID.")
-        elif command != "quit" :
-            print("Error: Invalid command, type 'help'.")
+    setup()
+
+    SongStorageShell().cmdloop("SongStorage: type 'help' to see the available commands.")
 
 
 if __name__ == "__main__":